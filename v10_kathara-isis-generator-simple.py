@@ -9,8 +9,11 @@ import os
 import sys
 import re
 import argparse
-import hashlib
-from typing import Dict, List, Tuple, Optional
+import functools
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple, Optional, TextIO
 from datetime import datetime
 
 # Default configuration values
@@ -26,6 +29,24 @@ DEFAULT_CONFIG = {
     'MANAGER_PATTERNS': 'zabbix|snmp|manager|monitor|nms'
 }
 
+# Lines of a generator config file: [export] KEY=value with an optional trailing
+# comment, or any other non-blank, non-comment line captured as 'bad'. The value
+# starts and ends on a non-blank character so no two whitespace runs can overlap,
+# which keeps a failed match linear instead of backtracking on long blank runs.
+_CONFIG_KV_RE = re.compile(
+    r'(?m)^[ \t]*(?:'
+    r'(?:export[ \t]+)?(?P<key>[A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    r'(?:(?:["\']?(?P<value>[^#\s"\'](?:[^#\r\n"\']*[^#\s"\'])?)["\']?|["\']{1,2})[ \t]*)?'
+    r'(?P<comment>#[^\n]*)?'
+    r'|(?P<bad>[^#\s][^\n]*)'
+    r')$')
+
+# lab.conf lines starting with these are comments or lab metadata
+_SKIP_PREFIXES = ('#', 'LAB_')
+
+# lab.conf device property keys, e.g. r1[0] or r1[image]
+_DEVICE_PROP_RE = re.compile(r'^([^[]+)\[([^]]+)\]$')
+
 # Color codes for output
 class Colors:
     RED = '\033[0;31m'
@@ -34,52 +55,184 @@ class Colors:
     BLUE = '\033[0;34m'
     NC = '\033[0m'
 
+# Bound once so the print helpers avoid a sys attribute lookup per call
+_stderr = sys.stderr
+
+# Only colorize when stderr is a terminal; redirected logs get plain prefixes
+_USE_COLOR = _stderr.isatty()
+
+def _prefix(color: str, label: str) -> str:
+    return f"{color}[{label}]{Colors.NC} " if _USE_COLOR else f"[{label}] "
+
+_INFO_PREFIX = _prefix(Colors.BLUE, "INFO")
+_SUCCESS_PREFIX = _prefix(Colors.GREEN, "SUCCESS")
+_WARNING_PREFIX = _prefix(Colors.YELLOW, "WARNING")
+_ERROR_PREFIX = _prefix(Colors.RED, "ERROR")
+
+def _log(prefix: str, message: str):
+    # One write per message so lines from generator threads don't interleave
+    _stderr.write(prefix + message + "\n")
+
 def print_info(message: str):
-    print(f"{Colors.BLUE}[INFO]{Colors.NC} {message}", file=sys.stderr)
+    _log(_INFO_PREFIX, message)
 
 def print_success(message: str):
-    print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} {message}", file=sys.stderr)
+    _log(_SUCCESS_PREFIX, message)
 
 def print_warning(message: str):
-    print(f"{Colors.YELLOW}[WARNING]{Colors.NC} {message}", file=sys.stderr)
+    _log(_WARNING_PREFIX, message)
 
 def print_error(message: str):
-    print(f"{Colors.RED}[ERROR]{Colors.NC} {message}", file=sys.stderr)
+    _log(_ERROR_PREFIX, message)
+
+# Startup script blocks shared by every device. Static blocks are emitted
+# as-is; the templates only carry the few per-device values.
+_IP_FORWARD_BLOCK = """# Enable IP forwarding
+echo "Enabling IP forwarding..."
+sysctl -w net.ipv4.ip_forward=1
+
+"""
+
+_FRR_BOOTSTRAP_BLOCK = """# Enable ISIS daemon in FRR
+echo "Enabling ISIS daemon..."
+sed -i 's/isisd=no/isisd=yes/' /etc/frr/daemons
+
+# Start FRR daemons
+echo "Starting FRR daemons..."
+/usr/lib/frr/frrinit.sh start
+
+# Wait for FRR to start
+sleep 8
+
+# Restart FRR to ensure isisd is loaded
+echo "Restarting FRR with ISIS enabled..."
+/usr/lib/frr/frrinit.sh restart
+
+# Wait for restart
+sleep 5
+
+# Check if isisd is running, start manually if needed
+if ! pgrep isisd > /dev/null; then
+    echo "Starting isisd manually..."
+    /usr/lib/frr/isisd -d
+    sleep 3
+fi
+
+# Configure FRR ISIS via vtysh
+echo "Configuring ISIS routing..."
+vtysh << 'FRRCMD'
+configure terminal
+"""
+
+_ISIS_ROUTER_TEMPLATE = """router isis {proc}
+ net {net}
+ is-type level-2-only
+ log-adjacency-changes
+ redistribute connected level-2
+exit
+"""
+
+_ISIS_IFACE_TEMPLATE = """interface eth{if_num}
+ ip router isis {proc}
+exit
+"""
+
+_TAIL_TEMPLATE = """write
+exit
+FRRCMD
+
+# Set DNS resolver
+echo "nameserver {dns}" > /etc/resolv.conf
+
+echo "Configuration completed for {name}"
+echo "Device {name} is ready!"
+
+# Keep container running
+tail -f /dev/null
+"""
+
+_PC_TAIL_TEMPLATE = """# Set DNS resolver
+echo "nameserver {dns}" > /etc/resolv.conf
+
+echo "Configuration completed for {name}"
+echo "Container accessible via Docker bridge and ISIS networks"
+
+# Keep container running
+tail -f /dev/null
+"""
+
+@functools.lru_cache(maxsize=None)
+def _format_interface_ip(mgmt: bool, device_index: int, total_devices: int, subnet_num: int,
+                         mgmt_subnet: str, ptp_subnet: str, multi_subnet: str) -> str:
+    """Format an interface address from its network type, position and size"""
+    if mgmt:
+        return f"{mgmt_subnet}.{10 + device_index}/24"
+    elif total_devices == 2:
+        # For /30 networks: .1 and .2 are the only usable IPs
+        # device_index starts at 1, so we use device_index directly (1,2)
+        return f"{ptp_subnet}.{subnet_num}.{device_index}/30"
+    else:
+        return f"{multi_subnet}.{subnet_num}.0.{device_index + 1}/24"
 
 class SimpleISISGenerator:
     def __init__(self):
         self.config = DEFAULT_CONFIG.copy()
-        self.devices = []
-        self.device_networks = {}
+        self.devices: Tuple[str, ...] = ()
+        self.device_networks: Dict[str, List[Tuple[int, str]]] = {}
         self.device_images = {}
         self.device_types = {}
-        
+        self.network_devices: Dict[str, List[str]] = {}
+        self.device_net_set: Dict[str, Set[str]] = {}
+        self.network_positions: Dict[str, Dict[str, int]] = {}
+        self.network_count: Dict[str, int] = {}
+        self._frr_routers_live: List[str] = []
+        self._generated: List[str] = []
+        self._frr_set: Set[str] = set()
+        self._mgmt_cache: Dict[str, bool] = {}
+        self._external_cache: Dict[str, bool] = {}
+        self._router_cache: Dict[str, Optional[str]] = {}
+        self._router_ip_cache: Dict[Tuple[str, str], Optional[str]] = {}
+        self._subnet_num: Dict[str, int] = {}
+        self._compile_patterns()
+        
+    def _compile_patterns(self):
+        """Compile the config-driven device type patterns once config is final"""
+        self._router_re = re.compile(self.config['ROUTER_PATTERNS'], re.IGNORECASE)
+        self._pc_re = re.compile(self.config['PC_PATTERNS'], re.IGNORECASE)
+        self._manager_re = re.compile(self.config['MANAGER_PATTERNS'], re.IGNORECASE)
+    
     def load_config_file(self, config_file: str):
         """Load configuration from file"""
         if config_file and os.path.isfile(config_file):
             print_info(f"Loading configuration from {config_file}")
             try:
                 with open(config_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            self.config[key.strip()] = value.strip().strip('\'"')
+                    text = f.read()
+                
+                for match in _CONFIG_KV_RE.finditer(text):
+                    if match.group('bad') is not None:
+                        print_warning(f"Ignoring unrecognised line in {config_file}: {match.group('bad').rstrip()}")
+                        continue
+                    
+                    key = match.group('key')
+                    value = match.group('value') or ''
+                    # A '#' directly after the value is read as a comment, not part of the value
+                    if match.group('comment') and text[match.start('comment') - 1] not in ' \t':
+                        print_warning(f"Value for {key} in {config_file} truncated at '#': {value!r}")
+                    self.config[key] = value
             except Exception as e:
                 print_error(f"Error loading config file: {e}")
                 sys.exit(1)
+        
+        self._compile_patterns()
     
     def detect_device_type(self, image: str) -> str:
         """Detect device type from image name"""
-        router_patterns = self.config['ROUTER_PATTERNS']
-        pc_patterns = self.config['PC_PATTERNS']
-        manager_patterns = self.config['MANAGER_PATTERNS']
-        
-        if re.search(router_patterns, image, re.IGNORECASE):
+        if self._router_re.search(image):
             return "router"
-        elif re.search(manager_patterns, image, re.IGNORECASE):
+        elif self._manager_re.search(image):
             return "manager"
-        elif re.search(pc_patterns, image, re.IGNORECASE):
+        elif self._pc_re.search(image):
             return "pc"
         else:
             return "generic"
@@ -92,60 +245,92 @@ class SimpleISISGenerator:
         
         print_info("Parsing lab.conf...")
         
-        try:
-            with open(lab_conf, 'r') as f:
-                content = f.read()
-        except Exception as e:
-            print_error(f"Error reading lab.conf: {e}")
-            sys.exit(1)
-        
         devices = set()
+        routers = set()
+        self.network_devices = {}
+        self.device_net_set = {}
+        self.network_count = {}
         
-        # Parse device configurations
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('#') or line.startswith('LAB_'):
-                continue
-            
-            if '=' in line:
-                left, right = line.split('=', 1)
-                right = right.strip().strip('"\'')
-                
-                pattern = r'^([^[]+)\[([^]]+)\]$'
-                device_match = re.match(pattern, left)
-                if device_match:
-                    device, property_name = device_match.groups()
-                    devices.add(device)
+        # Parse device configurations, streaming lines from a buffered file.
+        # Device types and the network index are filled in the same pass.
+        try:
+            with open(lab_conf, 'r', buffering=1 << 20) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith(_SKIP_PREFIXES):
+                        continue
+                    
+                    left, sep, right = line.partition('=')
+                    if not sep:
+                        continue
+                    right = right.strip().strip('"\'')
                     
-                    if property_name == 'image':
-                        self.device_images[device] = right
-                        self.device_types[device] = self.detect_device_type(right)
-                    elif property_name.isdigit():
-                        if device not in self.device_networks:
-                            self.device_networks[device] = []
-                        self.device_networks[device].append(f"{property_name}:{right}")
+                    device_match = _DEVICE_PROP_RE.match(left)
+                    if device_match:
+                        device, property_name = device_match.groups()
+                        # Intern so every dict/set keyed on this name shares one string object
+                        device = sys.intern(device)
+                        devices.add(device)
+                        
+                        if property_name == 'image':
+                            device_type = self.detect_device_type(right)
+                            self.device_images[device] = right
+                            self.device_types[device] = device_type
+                            if device_type == "router":
+                                routers.add(device)
+                            else:
+                                routers.discard(device)
+                        elif property_name.isdecimal():
+                            self.device_networks.setdefault(device, []).append((int(property_name), right))
+                            device_nets = self.device_net_set.setdefault(device, set())
+                            if right not in device_nets:
+                                device_nets.add(right)
+                                self.network_devices.setdefault(right, []).append(device)
+                                self.network_count[right] = self.network_count.get(right, 0) + 1
+        except (OSError, UnicodeDecodeError) as e:
+            print_error(f"Error reading lab.conf: {e}")
+            sys.exit(1)
         
-        self.devices = sorted(list(devices))
+        self.devices = tuple(sorted(devices))
+        self._frr_routers_live = sorted(routers)
         
         for device in self.devices:
             if device not in self.device_networks:
                 self.device_networks[device] = []
+                self.device_net_set[device] = set()
             if device not in self.device_images:
                 self.device_images[device] = "unknown"
                 self.device_types[device] = "generic"
+        
+        self._finalize_network_index()
+    
+    def _finalize_network_index(self):
+        """Order the network -> devices index and compute per-network device positions"""
+        self.network_positions = {}
+        
+        # Position is 1-based and follows device order, as used for IP allocation
+        for network_name, devices in self.network_devices.items():
+            devices.sort()
+            self.network_positions[network_name] = {device: position for position, device in enumerate(devices, 1)}
+        
+        self._clear_network_caches()
+    
+    def _clear_network_caches(self):
+        """Drop memoized per-network results after the index or router set changes"""
+        self._mgmt_cache.clear()
+        self._external_cache.clear()
+        self._router_cache.clear()
+        self._router_ip_cache.clear()
     
     def identify_frr_routers(self) -> List[str]:
         """Identify which devices need ISIS configuration"""
-        frr_routers = []
+        # Routers are collected while parsing lab.conf
+        frr_routers = list(self._frr_routers_live)
         
         print_info("Identifying routers...")
         
-        for device in self.devices:
-            device_type = self.device_types[device]
-            
-            if device_type == "router":
-                frr_routers.append(device)
-                print_success(f"Found router: {device} (image: {self.device_images[device]})")
+        for device in frr_routers:
+            print_success(f"Found router: {device} (image: {self.device_images[device]})")
         
         if not frr_routers:
             print_warning("No routers found in lab.conf")
@@ -155,106 +340,176 @@ class SimpleISISGenerator:
     
     def is_management_network(self, network_name: str) -> bool:
         """Check if network is management network"""
+        cached = self._mgmt_cache.get(network_name)
+        if cached is not None:
+            return cached
+        
         has_manager = False
         has_router = False
         
-        for device in self.devices:
-            networks = self.device_networks[device]
-            if any(network_name in net for net in networks):
-                device_type = self.device_types[device]
-                if device_type == "manager":
-                    has_manager = True
-                elif device_type == "router":
-                    has_router = True
-        
-        return has_manager and has_router
+        for device in self.network_devices.get(network_name, []):
+            device_type = self.device_types[device]
+            if device_type == "manager":
+                has_manager = True
+            elif device_type == "router":
+                has_router = True
+        
+        result = has_manager and has_router
+        self._mgmt_cache[network_name] = result
+        return result
+    
+    def _compute_subnet_num(self, network_name: str) -> int:
+        """Derive the subnet number used for a non-management network"""
+        # Use the network name directly if it's numeric, otherwise hash it
+        try:
+            # If network_name is a number, use it directly to avoid conflicts
+            subnet_num = int(network_name)
+            # Ensure it's in valid range
+            subnet_num = (subnet_num % 250) + 1
+        except ValueError:
+            # If not numeric, bucket it with CRC32 - a stable, cheap, non-cryptographic hash
+            subnet_num = (zlib.crc32(network_name.encode()) % 250) + 1
+        
+        return subnet_num
+    
+    def _get_subnet_num(self, network_name: str) -> int:
+        """Return the cached subnet number for a network, computing it on first use"""
+        # The subnet number depends only on the network name, so compute it once
+        subnet_num = self._subnet_num.get(network_name)
+        if subnet_num is None:
+            subnet_num = self._compute_subnet_num(network_name)
+            self._subnet_num[network_name] = subnet_num
+        return subnet_num
     
     def generate_ip_for_network(self, network_name: str, device_index: int, total_devices: int, device_name: str = None) -> str:
         """Generate IP addresses for interfaces"""
+        mgmt = self.is_management_network(network_name)
+        
         # Special case for snmp_manager on management networks
-        if device_name == 'snmp_manager' and self.is_management_network(network_name):
+        if device_name == 'snmp_manager' and mgmt:
             return f"{self.config['MGMT_SUBNET']}.7/24"
         
-        if self.is_management_network(network_name):
-            return f"{self.config['MGMT_SUBNET']}.{10 + device_index}/24"
-        else:
-            # Use the network name directly if it's numeric, otherwise hash it
-            try:
-                # If network_name is a number, use it directly to avoid conflicts
-                subnet_num = int(network_name)
-                # Ensure it's in valid range
-                subnet_num = (subnet_num % 250) + 1
-            except ValueError:
-                # If not numeric, use hash but with better collision avoidance
-                hash_obj = hashlib.md5(network_name.encode())
-                hash_hex = hash_obj.hexdigest()
-                # Use more bits to reduce collisions
-                subnet_num = (int(hash_hex[:4], 16) % 250) + 1
-            
-            if total_devices == 2:
-                # For /30 networks: .1 and .2 are the only usable IPs
-                # device_index starts at 1, so we use device_index directly (1,2)
-                return f"{self.config['PTP_SUBNET']}.{subnet_num}.{device_index}/30"
-            else:
-                return f"{self.config['MULTI_SUBNET']}.{subnet_num}.0.{device_index + 1}/24"
+        subnet_num = 0 if mgmt else self._get_subnet_num(network_name)
+        
+        return _format_interface_ip(mgmt, device_index, total_devices, subnet_num,
+                                    self.config['MGMT_SUBNET'], self.config['PTP_SUBNET'], self.config['MULTI_SUBNET'])
     
-    def is_external_network(self, network_name: str, frr_routers: List[str]) -> bool:
+    def is_external_network(self, network_name: str) -> bool:
         """Check if a network connects to external devices"""
-        for device in self.devices:
-            networks = self.device_networks[device]
-            if any(network_name in net for net in networks):
-                if device not in frr_routers:
-                    return True
-        return False
+        cached = self._external_cache.get(network_name)
+        if cached is None:
+            cached = any(device not in self._frr_set for device in self.network_devices.get(network_name, []))
+            self._external_cache[network_name] = cached
+        return cached
     
-    def find_router_on_network(self, network_name: str, frr_routers: List[str]) -> Optional[str]:
+    def find_router_on_network(self, network_name: str) -> Optional[str]:
         """Find the router connected to a specific network"""
-        for router in frr_routers:
-            if any(network_name in net for net in self.device_networks[router]):
-                return router
-        return None
+        if network_name not in self._router_cache:
+            self._router_cache[network_name] = next(
+                (device for device in self.network_devices.get(network_name, []) if device in self._frr_set), None)
+        return self._router_cache[network_name]
     
-    def get_router_ip_on_network(self, router: str, network_name: str, frr_routers: List[str]) -> Optional[str]:
+    def get_router_ip_on_network(self, router: str, network_name: str) -> Optional[str]:
         """Get the IP address of a router on a specific network"""
-        router_position = 0
-        device_count = 0
+        key = (router, network_name)
+        if key in self._router_ip_cache:
+            return self._router_ip_cache[key]
         
-        # Count devices on this network and find router position
-        for device in self.devices:
-            if any(network_name in net for net in self.device_networks[device]):
-                device_count += 1
-                if device == router:
-                    router_position = device_count
+        router_ip = None
+        router_position = self.network_positions.get(network_name, {}).get(router, 0)
         
         if router_position > 0:
+            device_count = self.network_count[network_name]
             router_ip = self.generate_ip_for_network(network_name, router_position, device_count, router)
-            return router_ip.split('/')[0]
+            router_ip = router_ip.partition('/')[0]
         
-        return None
+        self._router_ip_cache[key] = router_ip
+        return router_ip
+    
+    def _warm_network_caches(self):
+        """Fill the per-network caches up front so generator threads only read them"""
+        for network_name in self.network_devices:
+            if not self.is_management_network(network_name):
+                self._get_subnet_num(network_name)
+            self.is_external_network(network_name)
+            router = self.find_router_on_network(network_name)
+            if router:
+                self.get_router_ip_on_network(router, network_name)
     
-    def safe_write_file(self, filename: str, content: str, executable: bool = False):
-        """Safely write content to file with error handling"""
+    @contextmanager
+    def safe_open_for_write(self, filename: str, executable: bool = False):
+        """Open a file for buffered streaming writes with error handling"""
         try:
-            with open(filename, 'w') as f:
-                f.write(content)
-            
-            if executable:
-                os.chmod(filename, 0o755)
+            # Create with the final mode; fchmod covers umask and pre-existing files
+            mode = 0o755 if executable else 0o644
+            fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+            with os.fdopen(fd, 'w', buffering=1 << 16) as f:
+                if executable:
+                    os.fchmod(fd, mode)
+                yield f
             
+            self._generated.append(filename)
             print_success(f"Generated {filename}")
             
-        except Exception as e:
+        except OSError as e:
             print_error(f"Failed to write {filename}: {e}")
             sys.exit(1)
     
-    def generate_isis_config(self, router_name: str, router_index: int, frr_routers: List[str]):
+    def _emit_interface_config(self, f: TextIO, networks: List[Tuple[int, str]], owner_name: str,
+                               is_router: bool) -> Tuple[str, List[str]]:
+        """Write interface configuration for a device, returning its NAT interface and ISIS gateways"""
+        external_interface = ""
+        gateways = []
+        
+        for if_num, network_name in networks:
+            # Look up device count and this device's position on the network
+            device_count = self.network_count[network_name]
+            device_position = self.network_positions[network_name][owner_name]
+            
+            # Generate IP address
+            ip_addr = self.generate_ip_for_network(network_name, device_position, device_count, owner_name)
+            
+            if is_router:
+                # Check if this is an external network
+                if not external_interface and self.is_external_network(network_name):
+                    external_interface = f"eth{if_num}"
+                
+                f.write(f"""# Configure interface eth{if_num}
+echo "Configuring eth{if_num} with IP {ip_addr} on network {network_name}"
+ip addr add {ip_addr} dev eth{if_num}
+ip link set eth{if_num} up
+
+""")
+            else:
+                f.write(f"""# Configure interface eth{if_num}
+echo "Configuring eth{if_num} with IP {ip_addr}"
+ip addr add {ip_addr} dev eth{if_num}
+ip link set eth{if_num} up
+
+""")
+                
+                # Find router on this network for ISIS gateway
+                router = self.find_router_on_network(network_name)
+                if router:
+                    router_ip = self.get_router_ip_on_network(router, network_name)
+                    if router_ip:
+                        gateways.append(router_ip)
+        
+        return external_interface, gateways
+    
+    def generate_isis_config(self, router_name: str, router_index: int):
         """Generate simple, working ISIS configuration"""
         print_info(f"Generating ISIS configuration for {router_name}...")
         
-        networks = self.device_networks[router_name]
         startup_file = f"{router_name}.startup"
+        with self.safe_open_for_write(startup_file, executable=True) as f:
+            self._write_isis_config(f, router_name, router_index)
+    
+    def _write_isis_config(self, f: TextIO, router_name: str, router_index: int):
+        """Stream the ISIS router startup script to an open file"""
+        networks = self.device_networks[router_name]
         
-        content = f"""#!/bin/bash
+        f.write(f"""#!/bin/bash
 
 # Startup configuration for {router_name}
 # Generated by Kathara ISIS Generator - Simple & Working Version
@@ -265,148 +520,58 @@ echo "Starting configuration for {router_name}..."
 # Wait for interfaces to be ready
 sleep 5
 
-"""
+""")
         
         # Configure interfaces
-        external_interface = ""
-        
-        for network_info in networks:
-            if not network_info:
-                continue
-            
-            try:
-                if_num, network_name = network_info.split(':', 1)
-            except ValueError:
-                continue
-            
-            # Count devices on this network
-            device_count = 0
-            device_position = 0
-            for device in self.devices:
-                if any(network_name in net for net in self.device_networks[device]):
-                    device_count += 1
-                    if device == router_name:
-                        device_position = device_count
-            
-            # Generate IP address
-            ip_addr = self.generate_ip_for_network(network_name, device_position, device_count, router_name)
-            
-            # Check if this is an external network
-            is_external = self.is_external_network(network_name, frr_routers)
-            
-            if is_external and not external_interface:
-                external_interface = f"eth{if_num}"
-            
-            content += f"""# Configure interface eth{if_num}
-echo "Configuring eth{if_num} with IP {ip_addr} on network {network_name}"
-ip addr add {ip_addr} dev eth{if_num}
-ip link set eth{if_num} up
-
-"""
+        external_interface, _ = self._emit_interface_config(f, networks, router_name, is_router=True)
         
         # Enable IP forwarding
-        content += """# Enable IP forwarding
-echo "Enabling IP forwarding..."
-sysctl -w net.ipv4.ip_forward=1
-
-"""
+        f.write(_IP_FORWARD_BLOCK)
         
         # Add NAT if there's an external interface
         if external_interface:
-            content += f"""# Configure NAT for external connectivity
+            f.write(f"""# Configure NAT for external connectivity
 echo "Configuring NAT on {external_interface}..."
 iptables -t nat -A POSTROUTING -o {external_interface} -j MASQUERADE
 
-"""
+""")
         
         # Simple FRR configuration
-        content += """# Enable ISIS daemon in FRR
-echo "Enabling ISIS daemon..."
-sed -i 's/isisd=no/isisd=yes/' /etc/frr/daemons
-
-# Start FRR daemons
-echo "Starting FRR daemons..."
-/usr/lib/frr/frrinit.sh start
-
-# Wait for FRR to start
-sleep 8
-
-# Restart FRR to ensure isisd is loaded
-echo "Restarting FRR with ISIS enabled..."
-/usr/lib/frr/frrinit.sh restart
-
-# Wait for restart
-sleep 5
-
-# Check if isisd is running, start manually if needed
-if ! pgrep isisd > /dev/null; then
-    echo "Starting isisd manually..."
-    /usr/lib/frr/isisd -d
-    sleep 3
-fi
-
-# Configure FRR ISIS via vtysh
-echo "Configuring ISIS routing..."
-vtysh << 'FRRCMD'
-configure terminal
-"""
+        f.write(_FRR_BOOTSTRAP_BLOCK)
         
         # Generate proper NET address
         system_id = f"{0:04d}.{0:04d}.{router_index + 1:04d}"
         net_address = f"49.{self.config['ISIS_AREA']}.{system_id}.00"
         
-        content += f"""router isis {self.config['ISIS_PROCESS']}
- net {net_address}
- is-type level-2-only
- log-adjacency-changes
- redistribute connected level-2
-exit
-"""
+        isis_process = self.config['ISIS_PROCESS']
+        f.write(_ISIS_ROUTER_TEMPLATE.format(proc=isis_process, net=net_address))
         
         # Add ALL interfaces to ISIS
-        for network_info in networks:
-            if not network_info:
-                continue
-            
-            try:
-                if_num, network_name = network_info.split(':', 1)
-            except ValueError:
-                continue
-            
-            content += f"""interface eth{if_num}
- ip router isis {self.config['ISIS_PROCESS']}
-exit
-"""
+        for if_num, _ in networks:
+            f.write(_ISIS_IFACE_TEMPLATE.format(if_num=if_num, proc=isis_process))
         
-        content += f"""write
-exit
-FRRCMD
-
-# Set DNS resolver
-echo "nameserver {self.config['DNS_SERVER']}" > /etc/resolv.conf
-
-echo "Configuration completed for {router_name}"
-echo "Device {router_name} is ready!"
-
-# Keep container running
-tail -f /dev/null
-"""
-        
-        self.safe_write_file(startup_file, content, executable=True)
+        f.write(_TAIL_TEMPLATE.format(dns=self.config['DNS_SERVER'], name=router_name))
     
-    def generate_basic_config(self, device_name: str, frr_routers: List[str]):
+    def generate_basic_config(self, device_name: str):
         """Generate simple configuration for non-router devices with Docker route preservation"""
         startup_file = f"{device_name}.startup"
         if os.path.isfile(startup_file):
             print_info(f"Startup file already exists for {device_name}, skipping...")
             return
         
-        networks = self.device_networks[device_name]
         device_type = self.device_types[device_name]
         
         print_info(f"Generating configuration for {device_name} (type: {device_type})...")
         
-        content = f"""#!/bin/bash
+        with self.safe_open_for_write(startup_file, executable=True) as f:
+            self._write_basic_config(f, device_name)
+    
+    def _write_basic_config(self, f: TextIO, device_name: str):
+        """Stream a non-router device startup script to an open file"""
+        networks = self.device_networks[device_name]
+        device_type = self.device_types[device_name]
+        
+        f.write(f"""#!/bin/bash
 
 # Startup configuration for {device_name}
 # Generated by Kathara ISIS Generator - Enhanced Version
@@ -418,43 +583,10 @@ echo "Starting configuration for {device_name}..."
 # Wait for interfaces to be ready
 sleep 3
 
-"""
+""")
         
         # Configure interfaces and find ISIS gateways
-        isis_gateways = []
-        
-        for network_info in networks:
-            if not network_info:
-                continue
-            
-            try:
-                if_num, network_name = network_info.split(':', 1)
-            except ValueError:
-                continue
-            
-            device_count = 0
-            device_position = 0
-            for device in self.devices:
-                if any(network_name in net for net in self.device_networks[device]):
-                    device_count += 1
-                    if device == device_name:
-                        device_position = device_count
-            
-            ip_addr = self.generate_ip_for_network(network_name, device_position, device_count, device_name)
-            
-            content += f"""# Configure interface eth{if_num}
-echo "Configuring eth{if_num} with IP {ip_addr}"
-ip addr add {ip_addr} dev eth{if_num}
-ip link set eth{if_num} up
-
-"""
-            
-            # Find router on this network for ISIS gateway
-            router = self.find_router_on_network(network_name, frr_routers)
-            if router:
-                router_ip = self.get_router_ip_on_network(router, network_name, frr_routers)
-                if router_ip:
-                    isis_gateways.append(router_ip)
+        _, isis_gateways = self._emit_interface_config(f, networks, device_name, is_router=False)
         
         # Smart routing for management access - preserve Docker connectivity
         if isis_gateways:
@@ -462,7 +594,7 @@ ip link set eth{if_num} up
             
             # Special handling for manager devices (like snmp_manager)
             if device_type == "manager":
-                content += f"""# Smart routing for management access
+                f.write(f"""# Smart routing for management access
 # Keep Docker connectivity for host access while enabling ISIS routing
 # Add specific routes for ISIS networks via ISIS gateway
 echo "Adding ISIS routing for inter-network traffic"
@@ -474,27 +606,17 @@ ip route add {self.config['MGMT_SUBNET']}.0/24 via {primary_gateway} metric 200
 # Keep Docker's default route for external/host connectivity
 # This preserves the ability for the host to reach this container
 
-"""
+""")
             else:
                 # For regular PCs, use standard routing but don't break Docker
-                content += f"""# Add ISIS network routes while preserving Docker connectivity
+                f.write(f"""# Add ISIS network routes while preserving Docker connectivity
 echo "Adding routes for ISIS networks via {primary_gateway}"
 ip route add 10.0.0.0/8 via {primary_gateway} metric 100 || true
 ip route add {self.config['MGMT_SUBNET']}.0/24 via {primary_gateway} metric 100 || true
 
-"""
-        
-        content += f"""# Set DNS resolver
-echo "nameserver {self.config['DNS_SERVER']}" > /etc/resolv.conf
-
-echo "Configuration completed for {device_name}"
-echo "Container accessible via Docker bridge and ISIS networks"
-
-# Keep container running
-tail -f /dev/null
-"""
+""")
         
-        self.safe_write_file(startup_file, content, executable=True)
+        f.write(_PC_TAIL_TEMPLATE.format(dns=self.config['DNS_SERVER'], name=device_name))
     
     def run(self, args):
         """Main execution function"""
@@ -518,6 +640,8 @@ tail -f /dev/null
         if args.dns_server:
             self.config['DNS_SERVER'] = args.dns_server
         
+        self._compile_patterns()
+        
         # Check if lab.conf exists
         if not os.path.isfile(args.lab_conf):
             print_error(f"lab.conf file not found: {args.lab_conf}")
@@ -533,23 +657,34 @@ tail -f /dev/null
         
         # Identify FRR routers
         frr_routers = self.identify_frr_routers()
+        self._frr_set = set(frr_routers)
+        self._clear_network_caches()
         
-        # Generate ISIS configuration for each router
-        for router_index, router in enumerate(frr_routers):
-            self.generate_isis_config(router, router_index, frr_routers)
+        # Each startup file is independent once the caches are warm, so write them in parallel
+        self._warm_network_caches()
+        other_devices = [device for device in self.devices if device not in self._frr_set]
         
-        # Generate basic configuration for other devices
-        for device in self.devices:
-            if device not in frr_routers:
-                self.generate_basic_config(device, frr_routers)
+        # list() drains each map so a worker error (including sys.exit) is re-raised here
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            try:
+                # Generate ISIS configuration for each router
+                list(executor.map(self.generate_isis_config, frr_routers, range(len(frr_routers))))
+                
+                # Generate basic configuration for other devices
+                list(executor.map(self.generate_basic_config, other_devices))
+            except BaseException:
+                # Stop at the first failure or Ctrl-C instead of writing the queued files
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
         
         print_success("Configuration generation complete!")
         print_info("Generated files:")
         
-        for device in self.devices:
-            startup_file = f"{device}.startup"
-            if os.path.isfile(startup_file):
-                print_info(f"  - {startup_file}")
+        # Emit the file list in one write rather than one print per file
+        if self._generated:
+            lines = [f"{_INFO_PREFIX}  - {filename}" for filename in sorted(self._generated)]
+            _stderr.write("\n".join(lines) + "\n")
+            _stderr.flush()
         
         print_info("")
         print_info("Usage:")